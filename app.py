@@ -1,12 +1,21 @@
 import gradio as gr
 import asyncio
 import os
+import time
+import atexit
+import signal
+import sys
+import threading
+from datetime import datetime
 from dotenv import load_dotenv
-from agents import Runner, trace, gen_trace_id
-from vector_db import VectorDBManager
+from agents import Runner, RawResponsesStreamEvent, trace, gen_trace_id
+from openai.types.responses import ResponseTextDeltaEvent
+from vector_db_singleton import get_vectorstore
 from db import SessionDBManager
 from session_handler import SessionHandler
 from auroville_agent import auroville_agent
+from vectordb_query_selector_agent import start_instructions_ticker, warmup as warmup_selector
+from intent_classifier import classify, CANNED_RESPONSES, warmup as warmup_intents
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +29,122 @@ SESSION_DB_FILE = "sessions.db"
 session_db_manager = SessionDBManager(db_file=SESSION_DB_FILE)
 session_handler = SessionHandler(session_db_manager=session_db_manager)
 
+# Minimum seconds between streamed UI updates
+STREAM_YIELD_INTERVAL = 0.05
+
+EMPTY_RESPONSE_MSG = "I apologize, but I couldn't generate a proper response. Please try again."
+ERROR_TEMPLATE = "I encountered an error: {}. Please try again."
+
+
+def _append_turn(history, question, answer):
+    """Return a new history list with the user question and assistant answer appended."""
+    return history + [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+# Write-behind queue for chat messages: (session_id, role, content, timestamp)
+SAVE_BATCH_SIZE = 50
+SAVE_BATCH_TIMEOUT = 0.05
+save_queue = None
+save_worker_task = None
+# Rows taken off the queue by the worker but not written yet; guarded by _save_lock so a
+# shutdown flush and the worker never write the same rows
+_unsaved_rows = []
+_save_lock = threading.Lock()
+
+
+def _write_unsaved_rows():
+    """
+    Write the pending rows in one batch and return how many were written.
+    """
+    with _save_lock:
+        rows = _unsaved_rows[:]
+        if rows:
+            session_handler.save_messages(rows)
+            del _unsaved_rows[:len(rows)]
+        return len(rows)
+
+
+async def _save_worker():
+    """
+    Drain the save queue, batching messages that arrive within SAVE_BATCH_TIMEOUT of each other.
+    """
+    while True:
+        _unsaved_rows.append(await save_queue.get())
+        try:
+            while len(_unsaved_rows) < SAVE_BATCH_SIZE:
+                _unsaved_rows.append(await asyncio.wait_for(save_queue.get(), timeout=SAVE_BATCH_TIMEOUT))
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await asyncio.to_thread(_write_unsaved_rows)
+        except Exception as e:
+            logger.error(f"Failed to save {len(_unsaved_rows)} messages: {e}")
+            _unsaved_rows.clear()
+
+
+def queue_message(session_id, role, content):
+    """
+    Queue a message for the background save worker, starting it on first use
+    (the queue and task must be created inside Gradio's running event loop).
+    """
+    global save_queue, save_worker_task
+    if save_worker_task is None or save_worker_task.done():
+        if save_queue is None:
+            save_queue = asyncio.Queue()
+        save_worker_task = asyncio.create_task(_save_worker())
+    # Timestamp at send time, so batched rows keep their order and real times
+    save_queue.put_nowait((session_id, role, content, datetime.utcnow().isoformat()))
+
+
+def flush_save_queue():
+    """
+    Save the worker's in-flight batch and any messages still waiting in the queue,
+    e.g. when the app shuts down.
+    """
+    if save_queue is not None:
+        while not save_queue.empty():
+            _unsaved_rows.append(save_queue.get_nowait())
+    try:
+        flushed = _write_unsaved_rows()
+        if flushed:
+            logger.info(f"Flushed {flushed} queued messages")
+    except Exception as e:
+        logger.error(f"Failed to flush {len(_unsaved_rows)} queued messages: {e}")
+
+
+def _handle_sigterm(signum, frame):
+    # Cloud Run stops the container with SIGTERM, which skips atexit handlers
+    flush_save_queue()
+    sys.exit(0)
+
+# session_id -> (raw message count, first content, last content, cleaned messages) from the previous turn
+MAX_CACHED_SESSIONS = 1000
+clean_history_cache = {}
+
+
+def get_clean_messages(session_id, messages):
+    """
+    Return messages reduced to 'role' and 'content'.
+    When the history has only grown since the session's previous turn, the cached cleaned
+    list is extended with the new messages instead of being rebuilt.
+    """
+    last_len, first_content, last_content, cached = clean_history_cache.pop(session_id, (0, None, None, []))
+    is_extension = (
+        0 < last_len <= len(messages)
+        and messages[0].get("content") == first_content
+        and messages[last_len - 1].get("content") == last_content
+    )
+    if not is_extension:
+        last_len, cached = 0, []
+
+    cached.extend({"role": m["role"], "content": m["content"]} for m in messages[last_len:] if "role" in m and "content" in m)
+
+    if messages:
+        clean_history_cache[session_id] = (len(messages), messages[0].get("content"), messages[-1].get("content"), cached)
+        if len(clean_history_cache) > MAX_CACHED_SESSIONS:
+            clean_history_cache.pop(next(iter(clean_history_cache)))
+    # The SDK gets its own list so the cached one is never shared
+    return list(cached)
+
 
 # -----------------------------
 # ASYNC STREAMING CHAT FUNCTION
@@ -36,17 +161,31 @@ async def streaming_chat(question, history, session_id):
         return
     
     # Save user message
-    session_handler.save_message(session_id, "user", question)
+    queue_message(session_id, "user", question)
+
+    # Answer obvious chitchat locally without invoking the agent
+    intent = await classify(question)
+    if intent:
+        logger.info(f"Short-circuiting '{intent}' message without the agent")
+        reply = CANNED_RESPONSES[intent]
+        yield _append_turn(history, question, reply)
+        queue_message(session_id, "assistant", reply)
+        return
     
     # Build conversation history for agent
     messages = history.copy()  # already [{"role": ..., "content": ...}]
     messages.append({"role": "user", "content": question})
     
+    # Built once; the assistant entry is updated in place while streaming and on errors
+    updated_history = _append_turn(history, question, "")
+
     try:
         response_text = ""
+        response_parts = []
         tool_call_in_progress = False
+        last_yield = 0.0
         # Clean the history to keep only 'role' and 'content'
-        clean_message = [{"role": m["role"], "content": m["content"]} for m in messages if "role" in m and "content" in m]
+        clean_message = get_clean_messages(session_id, messages)
 
         # Stream using Agent directly
         trace_id = gen_trace_id()
@@ -62,36 +201,36 @@ async def streaming_chat(question, history, session_id):
             
             async for event in result.stream_events():
                 # Handle different event types
-                event_type_name = type(event).__name__
-                if event_type_name == "RawResponsesStreamEvent":
+                if isinstance(event, RawResponsesStreamEvent):
                     data = event.data
                     # Only handle text delta events
-                    if data.__class__.__name__ == "ResponseTextDeltaEvent":
-                        response_text += data.delta  # append incremental text
-                        updated_history = history.copy()
-                        updated_history.append({"role": "user", "content": question})
-                        updated_history.append({"role": "assistant", "content": response_text})
-                        yield updated_history
+                    if isinstance(data, ResponseTextDeltaEvent):
+                        response_parts.append(data.delta)  # append incremental text
+                        now = time.monotonic()
+                        if now - last_yield > STREAM_YIELD_INTERVAL:
+                            response_text = "".join(response_parts)
+                            updated_history[-1]["content"] = response_text
+                            last_yield = now
+                            yield updated_history
             
         # Save assistant response
+        response_text = "".join(response_parts)
         if response_text:
-            session_handler.save_message(session_id, "assistant", response_text)
+            # Always flush the final state, which the throttle may have skipped
+            updated_history[-1]["content"] = response_text
+            yield updated_history
+            queue_message(session_id, "assistant", response_text)
         else:
-            error_msg = "I apologize, but I couldn't generate a proper response. Please try again."
-            updated_history = history.copy()
-            updated_history.append({"role": "user", "content": question})
-            updated_history.append({"role": "assistant", "content": error_msg})
+            updated_history[-1]["content"] = EMPTY_RESPONSE_MSG
             yield updated_history
-            session_handler.save_message(session_id, "assistant", error_msg)
+            queue_message(session_id, "assistant", EMPTY_RESPONSE_MSG)
         
     except Exception as e:
-        error_msg = f"I encountered an error: {str(e)}. Please try again."
+        error_msg = ERROR_TEMPLATE.format(e)
         logger.error(f"Error: {e}")
-        updated_history = history.copy()
-        updated_history.append({"role": "user", "content": question})
-        updated_history.append({"role": "assistant", "content": error_msg})
+        updated_history[-1]["content"] = error_msg
         yield updated_history
-        session_handler.save_message(session_id, "assistant", error_msg)
+        queue_message(session_id, "assistant", error_msg)
 
 # -----------------------------
 # GRADIO APP
@@ -122,6 +261,12 @@ if __name__ == "__main__":
             chatbot=chatbot,
             new_session_btn=new_session_btn
         )        
+        # Warm the Gemini connection in Gradio's event loop (runs once per process)
+        demo.load(fn=warmup_selector, inputs=None, outputs=None)
+        # Embed the chitchat seeds before the first message
+        demo.load(fn=warmup_intents, inputs=None, outputs=None)
+        # Keep the selector's date-stamped instructions rendered in the background
+        demo.load(fn=start_instructions_ticker, inputs=None, outputs=None)
         # Message submission handlers
         msg.submit(streaming_chat,inputs=[msg, chatbot, session_id_state],outputs=[chatbot]).then(lambda: "",None,msg )
         submit.click(streaming_chat,inputs=[msg, chatbot, session_id_state],outputs=[chatbot]).then(lambda: "",None,msg)       
@@ -129,6 +274,13 @@ if __name__ == "__main__":
         clear.click(lambda: [], None, chatbot)
 
     logger.info("App started with OpenAI Agents SDK - Real Streaming Enabled")
+
+    # Write out messages the background worker has not saved yet when the app exits or is stopped
+    atexit.register(flush_save_queue)
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    # Load the vector database in the background so the UI can accept traffic immediately
+    threading.Thread(target=get_vectorstore, name="vector-db-warmup", daemon=True).start()
     
     # --- START OF CLOUD RUN FIX ---
     # Cloud Run requires the server to listen on 0.0.0.0 and the port specified by the PORT environment variable (usually 8080).
@@ -1,20 +1,18 @@
 import os
+import functools
+import time
+import asyncio
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from agents import Agent, function_tool,OpenAIChatCompletionsModel
-from vector_db import VectorDBManager
-from vectordb_query_selector_agent import vectordb_query_selector_agent
+from vector_db_singleton import DB_MANAGER as db_manager, aembed_query, aget_vectorstore
+from vectordb_query_selector_agent import Specificity, adds_no_filters, cached_select
 # from vectordb_filtering_agent import vectordb_filtering_agent
 from openai import AsyncOpenAI
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-VECTOR_DB_NAME = "vector_db"
-DB_FOLDER = "input" 
-db_manager = VectorDBManager(folder=DB_FOLDER, db_name=VECTOR_DB_NAME)
-vectorstore = db_manager.create_or_load_db(force_refresh=False) 
-retriever = db_manager.get_retriever(k=50) 
 MODEL = "gemini-2.5-flash" 
 google_api_key = os.getenv('GOOGLE_API_KEY')
 GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
@@ -22,32 +20,29 @@ gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key)
 gemini_model = OpenAIChatCompletionsModel(model=MODEL, openai_client=gemini_client)
 # MODEL = "gpt-4.1-mini"
 
-INSTRUCTIONS = f"""
+INSTRUCTIONS_TEMPLATE = """
 You are an **AI Event Information Extractor** dedicated to providing structured and accurate event details from the Auroville community.
 
-Today's date is {datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")}.
+Today's date is {current_date}.
 
 Set your temperature **0.1**.
 
 Your role is to help users find information about events, activities, workshops, and schedules.
 
-You have access to two tools:
-1) **`vectordb_query_selector_agent`**: Generates the best possible refined search query and specificity based on the user input.
-2) **`search_auroville_events`**: Searches the vector database **AND filters results** for the user (handles everything internally).
+You have access to one tool:
+1) **`select_and_search`**: Refines the user input into the best possible search query and specificity, then searches the vector database **AND filters results** for the user (handles everything internally).
 
 ### **Workflow**
 
-1.  For event-related queries, first call **`vectordb_query_selector_agent`** with the user's question.
-2.  Then use **`search_auroville_events`** tool which is a vector DB with below parameters :
+1.  For event-related queries, call **`select_and_search`** with below parameter :
     * **user_query**: The original user question
-    * **refined_search_query**: The refined query from step 1
-    * **specificity**: The specificity level from step 1
+2.  The tool output starts with the **specificity** ("Broad" or "Specific") followed by the search results.
 3.  ** Format the final output and return the agent's response directly to the user **
 
 ### **Rules for Final Output Formatting **
 ** Your final output must be the formatted and filtered list of events. **
 ** DO NOT include the raw vector db search results in your final output to the user.**
-** Use the search_auroville_events output to format the result and donot hallucinate the results **
+** Use the select_and_search output to format the result and donot hallucinate the results **
 ** If you are not sure of any event simply say it so and donot hallucinate **
 ** Exclude ended events — only show upcoming or ongoing events (filter out those whose end date/time has passed).
 ** Cross-check for duplicate events — if multiple entries refer to the same event, only show one unique instance.
@@ -99,12 +94,85 @@ Format each event precisely as follows:
 7. **distribution**: [distribution]
 """
 
+# Instructions are rendered lazily per run so "today" never goes stale;
+# the rendered string is reused for INSTRUCTIONS_TTL_SECONDS.
+INSTRUCTIONS_TTL_SECONDS = 60
 
-# ----------------- RAG TOOL WITH CORRECTED METADATA FILTERING -----------------
-@function_tool
-def search_auroville_events(
+
+def make_instructions(template: str):
+    """
+    Return a dynamic instructions callable for an Agent that renders `template` with the current date.
+    """
+    cached = (float("-inf"), "")  # (monotonic timestamp, rendered instructions)
+
+    def build_instructions(ctx=None, agent=None) -> str:
+        # Called by the SDK with the run context and agent
+        nonlocal cached
+        cached_ts, cached_str = cached
+        now = time.monotonic()
+        if now - cached_ts >= INSTRUCTIONS_TTL_SECONDS:
+            current_date = datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")
+            cached_str = template.format(current_date=current_date)
+            cached = (now, cached_str)
+        return cached_str
+
+    return build_instructions
+
+
+build_instructions = make_instructions(INSTRUCTIONS_TEMPLATE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _derive_day(filter_date: str, year: int) -> Optional[str]:
+    """
+    Derive the weekday name from a date string, or None if it cannot be parsed.
+    `year` is used when the date has no year and is part of the cache key.
+    """
+    try:
+        return datetime.strptime(filter_date, "%B %d, %Y").strftime("%A")  # e.g. "October 29, 2025"
+    except ValueError:
+        # If date format doesn't include year, try a fallback (e.g. "October 29")
+        try:
+            return datetime.strptime(f"{filter_date}, {year}", "%B %d, %Y").strftime("%A")
+        except ValueError:
+            return None
+
+
+DOCUMENT_TEMPLATE = "Document %d (Day: %s | Date: %s | Location: %s):\n%s"
+# Retrieval depth per specificity; Broad queries are MMR-reranked from BROAD_FETCH_K candidates
+BROAD_K = 15
+BROAD_FETCH_K = 30
+SPECIFIC_K = 20
+
+
+async def _do_search(query_embedding, cache_key, is_broad: bool, chroma_filter: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Query the vectorstore directly so Chroma applies the metadata filter during the search,
+    format the results and store them in the query cache.
+    """
+    if chroma_filter:
+        logger.info(f"Applying Chroma Filter (OR logic, $eq): {chroma_filter}")
+
+    # Retrieve relevant documents, reusing the query embedding computed for the cache lookup
+    vectorstore = await aget_vectorstore()
+    if is_broad:
+        # Rerank a small candidate set for diversity instead of pulling a long list into the prompt
+        docs = await vectorstore.amax_marginal_relevance_search_by_vector(
+            query_embedding, k=BROAD_K, fetch_k=BROAD_FETCH_K, filter=chroma_filter or None
+        )
+    else:
+        docs = await vectorstore.asimilarity_search_by_vector(query_embedding, k=SPECIFIC_K, filter=chroma_filter or None)
+
+    # Format Output
+    result = format_event_docs(docs)
+    db_manager.query_cache.put(query_embedding, cache_key, result)
+    return result
+
+
+# ----------------- RAG SEARCH WITH CORRECTED METADATA FILTERING -----------------
+async def search_events(
     search_query: str, 
-    specificity: str,
+    specificity: Specificity,
     filter_day: Optional[str] = None,      # Metadata filter for day
     filter_date: Optional[str] = None,     # Metadata filter for date
     filter_location: Optional[str] = None  # Metadata filter for location
@@ -125,9 +193,20 @@ def search_auroville_events(
         str: Relevant information about Auroville events
     """
     logger.info(f"RAG Tool called with query: {search_query}")
+
+    # 0. Serve semantically identical queries with identical filters from the cache
+    cache_key = (specificity, filter_day, filter_date, filter_location)
+    query_embedding = await aembed_query(search_query)
+    cached_result = db_manager.query_cache.get(query_embedding, cache_key)
+    if cached_result is not None:
+        return cached_result
     
     # Dynamically adjust retrieval depth
-    k_value = 100 if specificity.lower() == "broad" else 20
+    is_broad = specificity == "Broad"
+
+    # Fast path: nothing to filter on
+    if not (filter_day or filter_date or filter_location):
+        return await _do_search(query_embedding, cache_key, is_broad)
     
     # 1. Collect all provided filter values
     chroma_filter: Dict[str, Any] = {}
@@ -139,19 +218,11 @@ def search_auroville_events(
 
     # Try to also derive day of week from date string (if possible)
     if filter_date:
-     try:
-        parsed_date = datetime.strptime(filter_date, "%B %d, %Y")  # e.g. "October 29, 2025"
-        derived_day = parsed_date.strftime("%A")
-        simple_filters["day"] = derived_day
-        logger.info(f"[FILTER] Derived weekday '{derived_day}' from date '{filter_date}'")
-     except ValueError:
-        # If date format doesn't include year, try a fallback (e.g. "October 29")
-        try:
-            parsed_date = datetime.strptime(filter_date + f", {datetime.now().year}", "%B %d, %Y")
-            derived_day = parsed_date.strftime("%A")
+        derived_day = _derive_day(filter_date, datetime.now().year)
+        if derived_day:
             simple_filters["day"] = derived_day
-            logger.info(f"[FILTER] Derived weekday '{derived_day}' from partial date '{filter_date}'")
-        except ValueError:
+            logger.info(f"[FILTER] Derived weekday '{derived_day}' from date '{filter_date}'")
+        else:
             logger.warning(f"[FILTER] Could not parse date '{filter_date}' to derive day")
     else:
         logger.info("[FILTER] No date provided — skipping date parsing.")
@@ -161,7 +232,7 @@ def search_auroville_events(
         simple_filters["day"] = filter_day
     if filter_location:
         simple_filters["location"] = filter_location
-    # 2. Build the Chroma filter structure for OR logic using $contains
+    # 2. Build the Chroma filter structure for OR logic using $eq
     if len(simple_filters) >= 1:
         # Build the list of individual conditions
         conditions: List[Dict[str, Dict[str, str]]] = []
@@ -174,42 +245,97 @@ def search_auroville_events(
         else:
             chroma_filter["$or"] = conditions
     
-    # 3. Prepare search arguments and invoke retriever
-    search_kwargs = {"k": k_value}
-    
-    if chroma_filter:
-        search_kwargs["filter"] = chroma_filter 
-        logger.info(f"Applying Chroma Filter (OR logic, $contains): {chroma_filter}")
+    # 3. Retrieve and format
+    return await _do_search(query_embedding, cache_key, is_broad, chroma_filter)
 
-    # Retrieve relevant documents with the vector search and metadata filter
-    docs = retriever.invoke(search_query, **search_kwargs)
 
-    # 4. Format Output
+def format_event_docs(docs) -> str:
+    """
+    Format retrieved documents for the agent, displaying the metadata fields for verification.
+    """
     if not docs:
         return "No relevant information found about Auroville events based on your query and filters."
-    
-    # Format all retrieved documents, displaying the metadata fields for verification
-    context = "\n\n".join([
-        f"Document {i+1} (Day: {doc.metadata.get('day', 'N/A')} | Date: {doc.metadata.get('date', 'N/A')} | Location: {doc.metadata.get('location', 'N/A')}):\n{doc.page_content}" 
-        for i, doc in enumerate(docs)
-    ])
+
+    context = "\n\n".join(
+        DOCUMENT_TEMPLATE % (i, meta.get('day', 'N/A'), meta.get('date', 'N/A'), meta.get('location', 'N/A'), doc.page_content)
+        for i, (doc, meta) in enumerate(((doc, doc.metadata) for doc in docs), start=1)
+    )
     
     logger.info(f"Retrieved {len(docs)} documents for RAG context")
     
     return f"Here is relevant information about Auroville events:\n\n{context}"
 
-#  vectordb_filtering_agent.as_tool(tool_name="vectordb_filtering_agent", tool_description="Searches the database AND filters results for the user")
 
-    
-tools = [vectordb_query_selector_agent.as_tool(tool_name="vectordb_query_selector_agent", tool_description="Generates a input query for the vector db search"),
-         search_auroville_events
-         ]
+# ----------------- COMBINED SELECTOR + SEARCH TOOL -----------------
+@function_tool
+async def select_and_search(user_query: str) -> str:
+    """
+    Refine the user's question into a vector DB query and search Auroville events in a single step.
+
+    When the question would get no metadata filters, the selector's response is streamed: as soon
+    as its refined search query is complete, an unfiltered search on it starts while the rest of
+    the selection is still being generated. That result is kept when the final selection is
+    Specific with the same query; otherwise a search is made with the final query and filters.
+
+    Args:
+        user_query: The original user question.
+
+    Returns:
+        str: The query specificity followed by relevant information about Auroville events
+    """
+    logger.info(f"Select and search called with query: {user_query}")
+
+    early_query = None
+    early_task = None
+
+    def on_search_query(search_query: str):
+        nonlocal early_query, early_task
+        if early_task is None:
+            logger.info(f"[SELECTOR] Starting early search for streamed query: {search_query}")
+            early_query = search_query
+            early_task = asyncio.create_task(search_events(search_query, "Specific"))
+            # Retrieve the exception of a discarded task so it is not reported as unhandled
+            early_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    # Filters come from the question itself, so an early unfiltered search would be discarded anyway
+    speculate = adds_no_filters(user_query)
+    try:
+        selection = await cached_select(user_query, on_search_query=on_search_query if speculate else None)
+    except Exception:
+        if early_task:
+            early_task.cancel()
+        raise
+    logger.info(f"[SELECTOR] {selection}")
+
+    has_filters = selection.filter_day or selection.filter_date
+    if (
+        early_task is not None
+        and selection.specificity == "Specific"
+        and not has_filters
+        and selection.search_query == early_query
+    ):
+        logger.info("Reusing early search results")
+        result = await early_task
+    else:
+        if early_task:
+            early_task.cancel()
+        result = await search_events(
+            selection.search_query,
+            selection.specificity,
+            selection.filter_day,
+            selection.filter_date,
+        )
+
+    return f"Specificity: {selection.specificity}\n\n{result}"
+
+
+tools = [select_and_search]
 # -----------------------------
 # CREATE AGENT
 # -----------------------------
 auroville_agent = Agent(
     name="Auroville Events Assistant",
-    instructions=INSTRUCTIONS,
+    instructions=build_instructions,
     model=gemini_model, 
     tools=tools
 )
@@ -30,11 +30,19 @@ class SessionDBManager:
         conn.commit()
         conn.close()
 
+    def save_many(self, rows):
+        """Insert many (session_id, role, content, timestamp) rows in a single transaction."""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO chats VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
     def load_history(self, session_id):
         conn = sqlite3.connect(self.db_file)
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT role, content FROM chats WHERE session_id = ? ORDER BY timestamp",
+            "SELECT role, content FROM chats WHERE session_id = ? ORDER BY timestamp, rowid",
             (session_id,)
         )
         rows = cursor.fetchall()
@@ -0,0 +1,117 @@
+# intent_classifier.py
+
+import re
+import logging
+from typing import Optional
+
+import numpy as np
+
+from vector_db_singleton import DB_MANAGER as db_manager, aembed_query
+from vectordb_query_selector_agent import mentions_event_details
+
+logger = logging.getLogger(__name__)
+
+# Whole-message greetings only, so "hi, what's on today?" still reaches the agent
+GREETING_RE = re.compile(r"^\s*(hi|hello|hey|namaste|good (morning|afternoon|evening))( there)?[\s!.,]*$", re.I)
+THANKS_RE = re.compile(r"^\s*(thanks|thank you|thx|ty)( (a lot|so much|very much))?[\s!.,]*$", re.I)
+GOODBYE_RE = re.compile(r"^\s*(bye|goodbye|see you|good night)[\s!.,]*$", re.I)
+
+# Seed utterances for the embedding nearest-neighbour check (utterance, intent)
+CHITCHAT_SEEDS = [
+    ("hi there, how are you?", "greeting"),
+    ("hello, good to meet you", "greeting"),
+    ("hey, what's up?", "greeting"),
+    ("good morning to you", "greeting"),
+    ("how are you doing today?", "greeting"),
+    ("thanks a lot, that was helpful", "thanks"),
+    ("thank you so much", "thanks"),
+    ("great, thanks for the help", "thanks"),
+    ("perfect, appreciate it", "thanks"),
+    ("ok thanks, that's all", "thanks"),
+    ("bye, see you later", "goodbye"),
+    ("goodbye and have a nice day", "goodbye"),
+    ("talk to you later", "goodbye"),
+    ("that's all for now, bye", "goodbye"),
+    ("good night", "goodbye"),
+    ("who are you?", "about"),
+    ("what can you do?", "about"),
+    ("are you a bot?", "about"),
+    ("what is this chatbot for?", "about"),
+    ("how can you help me?", "about"),
+]
+CHITCHAT_THRESHOLD = 0.9
+# Longer messages almost always carry an event question; skip the embedding call for them
+CHITCHAT_MAX_WORDS = 6
+WORD_RE = re.compile(r"[a-z0-9']+")
+# Only messages made entirely of these words can be chitchat; anything else ("pottery",
+# "events") is an event question and goes to the agent without an embedding call
+CHITCHAT_WORDS = frozenset(
+    [word for text, _ in CHITCHAT_SEEDS for word in WORD_RE.findall(text)]
+    + "ok okay cool nice awesome hiya yo morning evening afternoon night cheers much".split()
+)
+
+CANNED_RESPONSES = {
+    "greeting": "Hello! I can help you discover events, activities and workshops in Auroville. What would you like to find?",
+    "thanks": "You're welcome! Let me know if you'd like to find any other events in Auroville.",
+    "goodbye": "Goodbye! Come back anytime to see what's happening in Auroville.",
+    "about": "I'm the Auroville Events Assistant. Ask me about events, workshops and activities, e.g. \"What's happening today?\" or \"Yoga classes on Tuesday\".",
+}
+
+_seed_matrix: Optional[np.ndarray] = None
+_seed_intents = [intent for _, intent in CHITCHAT_SEEDS]
+
+
+async def _get_seed_matrix() -> np.ndarray:
+    global _seed_matrix
+    if _seed_matrix is None:
+        vectors = await db_manager.embeddings.aembed_documents([text for text, _ in CHITCHAT_SEEDS])
+        matrix = np.asarray(vectors, dtype=np.float32)
+        _seed_matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    return _seed_matrix
+
+
+async def classify(question: str) -> Optional[str]:
+    """
+    Classify obvious chitchat locally.
+
+    Returns:
+        The intent name (a key of CANNED_RESPONSES), or None if the question should go to the agent
+    """
+    if GREETING_RE.match(question):
+        return "greeting"
+    if THANKS_RE.match(question):
+        return "thanks"
+    if GOODBYE_RE.match(question):
+        return "goodbye"
+
+    if len(question.split()) > CHITCHAT_MAX_WORDS:
+        return None
+    words = WORD_RE.findall(question.lower())
+    if not words or not CHITCHAT_WORDS.issuperset(words) or mentions_event_details(question):
+        return None
+
+    try:
+        matrix = await _get_seed_matrix()
+        # Through the shared embedding cache, so a repeated message skips the remote call
+        query = np.asarray(await aembed_query(question), dtype=np.float32)
+        scores = matrix @ (query / np.linalg.norm(query))
+    except Exception as e:
+        logger.warning(f"[INTENT] Embedding check failed, falling back to agent: {e}")
+        return None
+
+    best = int(np.argmax(scores))
+    if scores[best] >= CHITCHAT_THRESHOLD:
+        logger.info(f"[INTENT] '{question}' matched '{_seed_intents[best]}' (similarity {scores[best]:.3f})")
+        return _seed_intents[best]
+    return None
+
+
+async def warmup():
+    """
+    Embed the chitchat seeds ahead of the first message (runs in Gradio's event loop via demo.load).
+    """
+    try:
+        await _get_seed_matrix()
+        logger.info("[INTENT] Seed embeddings ready")
+    except Exception as e:
+        logger.warning(f"[INTENT] Seed embedding warmup failed: {e}")
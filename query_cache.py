@@ -0,0 +1,104 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticQueryCache:
+    """
+    Thread-safe LRU cache keyed by query embeddings.
+
+    A lookup is a hit when a cached entry has the same exact `key`
+    (e.g. specificity + metadata filters) and its embedding has cosine
+    similarity >= `threshold` with the query embedding. Entries expire
+    after `ttl_seconds` and the least recently used entry is evicted once
+    `max_size` is reached.
+    """
+
+    def __init__(self, max_size=2000, ttl_seconds=600, threshold=0.97):
+        """
+        Args:
+            max_size: Maximum number of cached entries
+            ttl_seconds: Lifetime of an entry in seconds
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        # slot -> (key, value, expires_at), ordered from least to most recently used
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # Row i holds the normalized embedding stored in slot i
+        self._matrix: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_size, dtype=bool)
+        self._free_slots = list(range(max_size - 1, -1, -1))
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _release(self, slot: int):
+        del self._entries[slot]
+        self._valid[slot] = False
+        self._free_slots.append(slot)
+
+    def get(self, embedding, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for the closest matching embedding, or None.
+        """
+        with self._lock:
+            if self._matrix is None or not self._entries:
+                return None
+
+            query = self._normalize(embedding)
+            scores = self._matrix @ query
+            scores[~self._valid] = -np.inf
+            candidates = np.flatnonzero(scores >= self.threshold)
+            now = time.monotonic()
+
+            for slot in candidates[np.argsort(-scores[candidates])]:
+                slot = int(slot)
+                entry_key, value, expires_at = self._entries[slot]
+                if expires_at <= now:
+                    self._release(slot)
+                    continue
+                if entry_key == key:
+                    self._entries.move_to_end(slot)
+                    logger.info(f"[CACHE] Hit (similarity {scores[slot]:.3f})")
+                    return value
+            return None
+
+    def put(self, embedding, key: Hashable, value: Any):
+        """
+        Store `value` for the given embedding and key, evicting the LRU entry if full.
+        """
+        with self._lock:
+            vector = self._normalize(embedding)
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self.clear()
+
+            if not self._free_slots:
+                oldest_slot = next(iter(self._entries))
+                self._release(oldest_slot)
+
+            slot = self._free_slots.pop()
+            self._matrix[slot] = vector
+            self._valid[slot] = True
+            self._entries[slot] = (key, value, time.monotonic() + self.ttl_seconds)
+
+    def clear(self):
+        """
+        Drop all cached entries (e.g. after the vector database is rebuilt).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._valid[:] = False
+            self._free_slots = list(range(self.max_size - 1, -1, -1))
@@ -39,6 +39,15 @@ class SessionHandler:
             content: The message content
         """
         self.session_db.save_message(session_id, role, content)
+
+    def save_messages(self, rows):
+        """
+        Save a batch of messages to the database.
+        
+        Args:
+            rows: Iterable of (session_id, role, content, timestamp) tuples
+        """
+        self.session_db.save_many(rows)
     
     def format_history_for_prompt(self, history):
         """
@@ -0,0 +1,76 @@
+import os
+from datetime import date
+
+import pytest
+
+# The selector module builds its Gemini client at import time
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+from vectordb_query_selector_agent import QuerySelectorLLM, adds_no_filters, finalize, resolve_dates
+
+TODAY = date(2026, 10, 14)  # a Wednesday
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("what's on today?", ("Wednesday, October 14, 2026", "October 14, 2026", "Wednesday")),
+        ("concerts tonight", ("Wednesday, October 14, 2026", "October 14, 2026", "Wednesday")),
+        ("events tomorrow", ("Thursday, October 15, 2026", "October 15, 2026", "Thursday")),
+        ("the day after tomorrow", ("Friday, October 16, 2026", "October 16, 2026", "Friday")),
+        ("yoga on Tuesday", ("Tuesday, October 20, 2026", "October 20, 2026", "Tuesday")),
+        ("music on Wednesday", ("Wednesday, October 14, 2026", "October 14, 2026", "Wednesday")),
+        ("events on Nov 5", ("Thursday, November 5, 2026", "November 5, 2026", "Thursday")),
+        ("November 5th, 2025", ("Wednesday, November 5, 2025", "November 5, 2025", "Wednesday")),
+        ("the 5th of November 2025", ("Wednesday, November 5, 2025", "November 5, 2025", "Wednesday")),
+        ("dance on 3 Jan", ("Sunday, January 3, 2027", "January 3, 2027", "Sunday")),
+        ("every Saturday", ("every Saturday", None, "Saturday")),
+        ("what should I decide 5", ("", None, None)),
+        ("events on 31 feb", ("", None, None)),
+        ("sound healing", ("", None, None)),
+    ],
+)
+def test_resolve_dates(query, expected):
+    assert resolve_dates(query, TODAY) == expected
+
+
+@pytest.mark.parametrize(
+    "query, expected_query",
+    [
+        ("this weekend", "events this weekend"),
+        ("events next week", "events next week"),
+        ("12/11", "events 12/11"),
+        ("events on the 5th", "events the 5th"),
+        ("in March 2026", "events in March 2026"),
+        ("events in may", "events in may"),
+        ("events on sat", "events on sat"),
+        ("sat?", "events sat"),
+        ("31 feb", "events 31 feb"),
+    ],
+)
+def test_finalize_keeps_unresolved_dates_out_of_the_filters(query, expected_query):
+    selection = finalize(QuerySelectorLLM(search_query="events", specificity="Broad"), query, TODAY)
+    assert selection.search_query == expected_query
+    assert selection.filter_date is None and selection.filter_day is None
+
+
+@pytest.mark.parametrize("query", ["what's on?", "may I see the events", "sun salutation"])
+def test_finalize_defaults_broad_queries_to_today(query):
+    selection = finalize(QuerySelectorLLM(search_query="events", specificity="Broad"), query, TODAY)
+    assert selection.search_query == "events on Wednesday, October 14, 2026"
+    assert (selection.filter_day, selection.filter_date) == ("Wednesday", "October 14, 2026")
+
+
+def test_finalize_specific_query_without_date_has_no_filters():
+    selection = finalize(QuerySelectorLLM(search_query="sun salutation", specificity="specific."), "sun salutation", TODAY)
+    assert selection.specificity == "Specific"
+    assert selection.search_query == "sun salutation"
+    assert selection.filter_date is None and selection.filter_day is None
+    assert adds_no_filters("sun salutation")
+
+
+def test_finalize_keeps_the_venue_in_the_search_query():
+    selection = finalize(QuerySelectorLLM(search_query="dance", specificity="Specific"), "dance at Centre d’Art on Tuesday", TODAY)
+    assert selection.search_query == "dance at Centre d'Art on Tuesday, October 20, 2026"
+    assert selection.filter_date == "October 20, 2026"
+    assert not adds_no_filters("dance at Centre d’Art")
@@ -8,6 +8,7 @@ from langchain_text_splitters import CharacterTextSplitter
 from langchain_community.document_loaders import PyMuPDFLoader, TextLoader
 from langchain_core.documents import Document
 from dotenv import load_dotenv
+from query_cache import SemanticQueryCache
 
 load_dotenv(override=True)
 
@@ -23,6 +24,8 @@ class VectorDBManager:
             openai_api_key=os.getenv("OPENAI_API_KEY"),
         )
         self.vectorstore = None
+        # Semantic cache of formatted search results; shares self.embeddings with the vectorstore
+        self.query_cache = SemanticQueryCache(max_size=2000, ttl_seconds=600, threshold=0.97)
 
     def load_documents(self):
         documents = []
@@ -42,7 +45,9 @@ class VectorDBManager:
                         # extract raw metadata
                         day_raw = str(row.get("day", "N/A"))
                         date = str(row.get("date", "N/A"))
-                        location = str(row.get("location", "N/A"))
+                        # The event sheet names this column "Venue"
+                        venue = row.get("venue", row.get("location"))
+                        location = str(venue) if pd.notna(venue) else "N/A"
 
                         # ✅ NEW LOGIC: expand multi-day cells like '["Monday", "Tuesday"]'
                         if isinstance(day_raw, str) and day_raw.startswith("[") and day_raw.endswith("]"):
@@ -107,6 +112,8 @@ class VectorDBManager:
                 shutil.rmtree(self.db_name, ignore_errors=True)
 
             print("Creating new vector database with metadata...")
+            # Cached search results refer to the old database contents
+            self.query_cache.clear()
             documents = self.load_documents()
 
             text_splitter = CharacterTextSplitter(
@@ -0,0 +1,56 @@
+# vector_db_singleton.py
+
+import asyncio
+import threading
+from collections import OrderedDict
+
+from vector_db import VectorDBManager
+
+VECTOR_DB_NAME = "vector_db"
+DB_FOLDER = "input"
+
+# Shared by every agent module; the database itself is loaded lazily by get_vectorstore()
+DB_MANAGER = VectorDBManager(folder=DB_FOLDER, db_name=VECTOR_DB_NAME)
+_load_lock = threading.Lock()
+
+# Query embeddings by exact text, shared by the intent classifier and the search tools;
+# hits are repeated queries (e.g. the same refined search query from different users)
+EMBEDDING_CACHE_MAX_SIZE = 1024
+_embedding_cache: "OrderedDict[str, list]" = OrderedDict()
+
+
+def get_vectorstore():
+    """
+    Return the shared vectorstore, loading (or building) it on first use.
+    """
+    if DB_MANAGER.vectorstore is None:
+        with _load_lock:
+            if DB_MANAGER.vectorstore is None:
+                DB_MANAGER.create_or_load_db(force_refresh=False)
+    return DB_MANAGER.vectorstore
+
+
+async def aget_vectorstore():
+    """
+    Async variant of get_vectorstore() that loads the database in a worker thread,
+    so the first query does not block the event loop.
+    """
+    if DB_MANAGER.vectorstore is not None:
+        return DB_MANAGER.vectorstore
+    return await asyncio.to_thread(get_vectorstore)
+
+
+async def aembed_query(text: str) -> list:
+    """
+    Embed a query with the shared embeddings, reusing the vector when the same text
+    was embedded recently.
+    """
+    embedding = _embedding_cache.get(text)
+    if embedding is not None:
+        _embedding_cache.move_to_end(text)
+        return embedding
+    embedding = await DB_MANAGER.embeddings.aembed_query(text)
+    _embedding_cache[text] = embedding
+    if len(_embedding_cache) > EMBEDDING_CACHE_MAX_SIZE:
+        _embedding_cache.popitem(last=False)
+    return embedding
@@ -1,27 +1,23 @@
 # vectordb_filtering_agent.py
 
-from datetime import datetime
 import os
 import logging
-from typing import Optional, Dict, Any, List
-from vector_db import VectorDBManager 
+from typing import Optional
 from agents import Agent, function_tool, OpenAIChatCompletionsModel
 from openai import AsyncOpenAI  # Fixes NameError: AsyncOpenAI
+# Search and instructions helpers are shared with the main agent rather than copied here
+from auroville_agent import make_instructions, search_events
+from vectordb_query_selector_agent import normalize_specificity
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-VECTOR_DB_NAME = "vector_db"
-DB_FOLDER = "input" 
-db_manager = VectorDBManager(folder=DB_FOLDER, db_name=VECTOR_DB_NAME)
-vectorstore = db_manager.create_or_load_db(force_refresh=False) 
-retriever = db_manager.get_retriever(k=50) 
 MODEL = "gemini-2.5-flash" 
 google_api_key = os.getenv('GOOGLE_API_KEY')
 GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
 gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key)
 gemini_model = OpenAIChatCompletionsModel(model=MODEL, openai_client=gemini_client)
 
-INSTRUCTIONS = f"""
+INSTRUCTIONS_TEMPLATE = """
 You will receive:
 - user_query: The original user's question
 - specificity: Either "Broad" or "Specific", already determined by a previous step.
@@ -38,7 +34,7 @@ When calling the tool, always pass the correct `specificity` value.
 If missing, default to 'Broad'.
 
 You are an **analytical assistant** with deep knowledge of events and activities happening in Auroville, India.  
-Today's date is {datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")}.
+Today's date is {current_date}.
 
 **Your final output must be the formatted and filtered list of events. DO NOT include the raw vector db search results in your final output to the user.**
 
@@ -90,10 +86,12 @@ Format each event precisely as follows:
 7. **Interactive Details Link**: Generate the command text **[Show details for event #N]** (where N is the event's number in the final list) if the event has a description or poster. **This command text should be formatted as a click-to-chat/click-to-post button/link, so that when the user selects it, the command text itself is placed directly into the user's input/command line.** When the user submits this command, you will fetch and show the full description text. If a poster link is available in the event data, you **MUST** display the poster as an image inline with the description.
 """
 
+build_instructions = make_instructions(INSTRUCTIONS_TEMPLATE)
+
 
 # ----------------- RAG TOOL WITH CORRECTED METADATA FILTERING -----------------
 @function_tool
-def search_auroville_events(
+async def search_auroville_events(
     search_query: str, 
     specificity: str,
     filter_day: Optional[str] = None,      # Metadata filter for day
@@ -115,86 +113,15 @@ def search_auroville_events(
     Returns:
         str: Relevant information about Auroville events
     """
-    logger.info(f"RAG Tool called with query: {search_query}")
-    
-    # Dynamically adjust retrieval depth
-    k_value = 100 if specificity.lower() == "broad" else 20
-    
-    # 1. Collect all provided filter values
-    chroma_filter: Dict[str, Any] = {}
-    simple_filters: Dict[str, str] = {} 
-
-    # --- Enhanced filter handling: automatically include weekday if date is provided ---
-    if filter_date:
-     simple_filters["date"] = filter_date
-
-    # Try to also derive day of week from date string (if possible)
-    if filter_date:
-     try:
-        parsed_date = datetime.strptime(filter_date, "%B %d, %Y")  # e.g. "October 29, 2025"
-        derived_day = parsed_date.strftime("%A")
-        simple_filters["day"] = derived_day
-        logger.info(f"[FILTER] Derived weekday '{derived_day}' from date '{filter_date}'")
-     except ValueError:
-        # If date format doesn't include year, try a fallback (e.g. "October 29")
-        try:
-            parsed_date = datetime.strptime(filter_date + f", {datetime.now().year}", "%B %d, %Y")
-            derived_day = parsed_date.strftime("%A")
-            simple_filters["day"] = derived_day
-            logger.info(f"[FILTER] Derived weekday '{derived_day}' from partial date '{filter_date}'")
-        except ValueError:
-            logger.warning(f"[FILTER] Could not parse date '{filter_date}' to derive day")
-    else:
-        logger.info("[FILTER] No date provided — skipping date parsing.")
-        
-    # Add explicit filters if provided
-    if filter_day:
-        simple_filters["day"] = filter_day
-    if filter_location:
-        simple_filters["location"] = filter_location
-    # 2. Build the Chroma filter structure for OR logic using $contains
-    if len(simple_filters) >= 1:
-        # Build the list of individual conditions
-        conditions: List[Dict[str, Dict[str, str]]] = []
-        for key, value in simple_filters.items():
-            conditions.append({key: {"$eq": value}}) 
-        
-        if len(simple_filters) == 1:
-            key = next(iter(simple_filters.keys()))
-            chroma_filter[key] = conditions[0][key]
-        else:
-            chroma_filter["$or"] = conditions
-    
-    # 3. Prepare search arguments and invoke retriever
-    search_kwargs = {"k": k_value}
-    
-    if chroma_filter:
-        search_kwargs["filter"] = chroma_filter 
-        logger.info(f"Applying Chroma Filter (OR logic, $contains): {chroma_filter}")
-
-    # Retrieve relevant documents with the vector search and metadata filter
-    docs = retriever.invoke(search_query, **search_kwargs)
-
-    # 4. Format Output
-    if not docs:
-        return "No relevant information found about Auroville events based on your query and filters."
-    
-    # Format all retrieved documents, displaying the metadata fields for verification
-    context = "\n\n".join([
-        f"Document {i+1} (Day: {doc.metadata.get('day', 'N/A')} | Date: {doc.metadata.get('date', 'N/A')} | Location: {doc.metadata.get('location', 'N/A')}):\n{doc.page_content}" 
-        for i, doc in enumerate(docs)
-    ])
-    
-    logger.info(f"Retrieved {len(docs)} documents for RAG context")
-    
-    return f"Here is relevant information about Auroville events:\n\n{context}"
+    # This agent's LLM passes specificity as free text, e.g. "broad"
+    return await search_events(search_query, normalize_specificity(specificity), filter_day, filter_date, filter_location)
 
 # ----------------- AGENT INITIALIZATION -----------------
 tools = [search_auroville_events]
     
 vectordb_filtering_agent = Agent(
     name="vectordb_query_selector_agent", 
-    instructions=INSTRUCTIONS,
+    instructions=build_instructions,
     tools=tools,
     model=gemini_model
 )
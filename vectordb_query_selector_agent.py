@@ -1,70 +1,510 @@
-from datetime import datetime
-from pydantic import BaseModel, Field
-from typing import Optional
-from agents import Agent, function_tool, OpenAIChatCompletionsModel
+import re
+import json
+from datetime import datetime, date, timedelta
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Callable, Literal, Optional, List, Tuple
+from agents import Agent, AgentOutputSchema, AgentOutputSchemaBase, ModelBehaviorError, ModelSettings, RawResponsesStreamEvent, Runner, function_tool, OpenAIChatCompletionsModel
+from openai.types.responses import ResponseTextDeltaEvent
 from openai import AsyncOpenAI  # Fixes NameError: AsyncOpenAI
+import httpx
+import msgspec
 
 import os
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 # MODEL = "gpt-4.1-mini"
 MODEL = "gemini-2.5-flash" 
 google_api_key = os.getenv('GOOGLE_API_KEY')
 GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
-gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key)
+# Shared by every selector call: its httpx connection pool is what makes concurrent calls cheap,
+# so it must not be recreated per call. HTTP/2 multiplexes concurrent calls over one connection.
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=60.0),
+    timeout=httpx.Timeout(15.0, connect=3.0),
+    http2=True,
+)
+gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key, http_client=http_client)
 gemini_model = OpenAIChatCompletionsModel(model=MODEL, openai_client=gemini_client)
 
 
-class QuerySelector(BaseModel):
+Specificity = Literal["Broad", "Specific"]
+SPECIFICITIES = ("Broad", "Specific")
+
+
+def normalize_specificity(value):
+    """Map case/punctuation variants the LLM emits (e.g. "broad", "SPECIFIC.") onto Specificity."""
+    return value.strip().rstrip(".").capitalize() if isinstance(value, str) else value
+
+
+class QuerySelectorLLM(BaseModel):
+    """Fields generated by the selector LLM; the metadata filters are filled in by finalize()."""
+    model_config = ConfigDict(defer_build=False, validate_assignment=False, extra="ignore")
+
     search_query: str = Field(description="Final search query for the vector DB")
-    specificity: str = Field(description="Determine query specificity Broad (general date/day queries) or Specific (particular event queries)")
+    specificity: Specificity = Field(description="Determine query specificity Broad (general date/day queries) or Specific (particular event queries)")
+
+    @field_validator("specificity", mode="before")
+    @classmethod
+    def coerce_specificity(cls, value):
+        return normalize_specificity(value)
+
+
+class QuerySelector(QuerySelectorLLM):
     filter_day: Optional[str] = Field(default=None, description="Optional metadata filter specifying a day e.g. Monday, Tuesday")
     filter_date: Optional[str] = Field(default=None, description="Optional metadata filter specifying a date e.g. 2025-10-28")
-    filter_location: Optional[str] = Field(default=None,description="Optional metadata filter specifying a location e.g., Auroville, Pondicherry")
 
-INSTRUCTIONS = f"""
-You are an AI assistant designed to process user queries for an event search system.
-Today's date is {datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")}.
 
-Your primary role is to:
-1.  **Generate a highly precise search query** for a vector database.
-2.  **Classify the user's query** as **"Broad"** or **"Specific."**
-3.  **Populate the filder day, filder date and fiter location if present in the input query. **
----
+# Build the validators/serializers at import time instead of on the first request's critical path
+QuerySelectorLLM.model_rebuild(force=True)
+QuerySelector.model_rebuild(force=True)
+
 
-### ** Rules and Guidelines**
+class QuerySelectorFast(msgspec.Struct):
+    """msgspec mirror of QuerySelectorLLM, used to decode the selector's JSON output."""
+    search_query: str
+    specificity: str
 
-1.  **Temperature Setting:** Your response generation temperature must be set to $\mathbf{{0.1}}$.
-2.  **Date Resolution:** **Convert all relative date terms** (e.g., "today," "tomorrow") into **exact dates**. Use the provided current date: **{datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")}** to determine the exact date.
-3.  **Query Enhancement (Date/Day Inclusion):**
-    *  The final output must be a **crisp, concise, short, and precise** query directly usable for **semantic search** in the vector database.
-    * **Always** ensure that if a date is mentioned (e.g., "Nov 5"), the corresponding **weekday** is added to the search query.
-    * **Always** ensure that if a weekday is mentioned (e.g., "Wednesday"), the **nearest date** is added to the search query, *unless the user specifies a recurring event like "every Wednesday."*
-    * The final search query must focus on events happening on the specified date(s) or day(s).
-4.  **Date/Day Rule for Specificity:** **Only include dates/days in the final vector DB query if the user explicitly mentioned them** or if the query contains a relative date (like "today"). **Do not add a date by default** if the user asks a general query like "sound healing."
 
-### ** Query Classification**
+class QuerySelectorOutputSchema(AgentOutputSchemaBase):
+    """
+    Output schema for the selector agent. Advertises the same JSON schema as QuerySelectorLLM,
+    but decodes the model's JSON with msgspec and builds the QuerySelectorLLM without re-validating.
+    """
 
-Your task is to classify the user's query into one of two categories:
+    def __init__(self):
+        self._schema = AgentOutputSchema(QuerySelectorLLM)
+        self._decoder = msgspec.json.Decoder(QuerySelectorFast)
 
-| Category | Definition | Examples |
-| :--- | :--- | :--- |
-| **Broad** | General date/day/relative date queries **with no other specific keywords** related to event types (like **yoga, music, dance, healing, sound, movie, talk, workshop, etc.**). | * "What's happening today?"*<br>* "Events on Wednesday?"*<br>* "List all events for Nov 5."*<br>* "Tomorrow?" |
-| **Specific** | Queries that mention a **specific event type or location**, with or without a date/day. | * "Yoga classes on Tuesday?"*<br>* "Sound healing sessions?"*<br>* "Dance workshop on Dec 8?"*<br>* "What's happening at Cripa?"*<br>* "Events this weekend?" |
+    def is_plain_text(self) -> bool:
+        return False
 
----
+    def name(self) -> str:
+        return self._schema.name()
 
-### ** Vector DB Query Generation**
+    def json_schema(self):
+        return self._schema.json_schema()
 
-* **Vague Input Handling:** If the user input is vague (e.g., just "events"), you must classify it as **Broad** and assume the search is for **today's date**.
+    def is_strict_json_schema(self) -> bool:
+        return self._schema.is_strict_json_schema()
 
----
+    def validate_json(self, json_str: str) -> QuerySelectorLLM:
+        try:
+            fast = self._decoder.decode(json_str)
+        except msgspec.DecodeError as e:
+            raise ModelBehaviorError(f"Invalid JSON when parsing {json_str} for {self.name()}: {e}") from e
+        # model_construct skips the field validator, so normalize and check specificity here
+        specificity = normalize_specificity(fast.specificity)
+        if specificity not in SPECIFICITIES:
+            raise ModelBehaviorError(f"Invalid specificity {fast.specificity!r} for {self.name()}")
+        return QuerySelectorLLM.model_construct(search_query=fast.search_query, specificity=specificity)
 
+INSTRUCTIONS_TEMPLATE = """
+You convert user questions into search parameters for an Auroville event vector database.
+Today is {current_date}.
+
+Rules:
+- search_query: short, precise query for semantic search, without dates or weekdays (they are added separately).
+- specificity: Broad = date/day only; Specific = mentions an event type (yoga, music, dance, healing, sound, movie, talk, workshop, ...) or a location.
+- Vague input (e.g. "events") -> Broad.
+
+Examples:
+IN: "what's on tomorrow?" -> {"search_query": "events", "specificity": "Broad"}
+IN: "sound healing" -> {"search_query": "sound healing sessions", "specificity": "Specific"}
+IN: "yoga at Cripa on Tuesday" -> {"search_query": "yoga at Cripa", "specificity": "Specific"}
 """
 
+# ----------------- DETERMINISTIC DATE RESOLUTION -----------------
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+RELATIVE_DAY_OFFSETS = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}
+
+_RELATIVE_RE = re.compile(r"\b(day after tomorrow|today|tonight|tomorrow)\b", re.I)
+_DAY_RE = re.compile(r"\b(every\s+)?(mon|tues|wednes|thurs|fri|satur|sun)day\b", re.I)
+_MONTH_NAMES = r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?"
+# "Nov 5", "November 5th, 2025" and "5 Nov", "5th of November 2025"
+_MONTH_DAY_RE = re.compile(_MONTH_NAMES + r"\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?", re.I)
+_DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH_NAMES + r"(?:,?\s+(\d{4}))?", re.I)
+# Date-like phrases resolve_dates() cannot turn into a single date, e.g. "this weekend", "12/11",
+# "on the 5th", "in March 2026", "on sat" or an invalid "31 feb". "may" and the weekday abbreviations
+# are ordinary words too ("may I", "sun salutation"), so they only count after a preposition, before
+# a year, or as the whole query ("sat?")
+_DATE_HINT_RE = re.compile(
+    r"\b(?:(?:this|next|coming)\s+)?(?:week(?:end)?|month)\b"
+    r"|\b\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b"
+    r"|\b(?:\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?)?(?:in\s+)?"
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b"
+    r"(?:\s+\d{1,2}(?:st|nd|rd|th)?\b)?(?:,?\s+\d{4})?"
+    r"|\b(?:the\s+)?\d{1,2}(?:st|nd|rd|th)\b"
+    r"|\b(?:in|of|during)\s+may\b(?:,?\s+\d{4})?|\bmay\s+\d{4}\b"
+    r"|\b(?:on|this|next|coming|every|by|until|till)\s+(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)\b"
+    r"|^(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?=[\s?.!]*$)",
+    re.I,
+)
+
+
+def _explicit_date(query: str, today: date) -> Optional[date]:
+    match = _MONTH_DAY_RE.search(query)
+    if match:
+        month, day, year = match.group(1), match.group(2), match.group(3)
+    else:
+        match = _DAY_MONTH_RE.search(query)
+        if not match:
+            return None
+        day, month, year = match.group(1), match.group(2), match.group(3)
+
+    month_index = MONTHS.index(month.lower()[:3]) + 1
+    try:
+        resolved = date(int(year) if year else today.year, month_index, int(day))
+        # Without a year, prefer the next occurrence of the date
+        if not year and resolved < today:
+            resolved = resolved.replace(year=today.year + 1)
+    except ValueError:
+        return None
+    return resolved
+
+
+def resolve_dates(query: str, today: Optional[date] = None) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Resolve the date/day mentioned in a user query without the LLM.
+
+    Args:
+        query: The raw user query
+        today: Reference date (defaults to the current date)
+
+    Returns:
+        Tuple of (date text to add to the search query, filter_date e.g. "November 5, 2025",
+        filter_day e.g. "Wednesday"); empty/None when the query mentions no date or day
+    """
+    today = today or datetime.now().date()
+
+    relative = _RELATIVE_RE.search(query)
+    if relative:
+        resolved = today + timedelta(days=RELATIVE_DAY_OFFSETS[relative.group(1).lower()])
+    else:
+        resolved = _explicit_date(query, today)
+
+    if resolved is None:
+        weekday = _DAY_RE.search(query)
+        if not weekday:
+            return "", None, None
+        day_name = weekday.group(2).capitalize() + "day"
+        if weekday.group(1):
+            # Recurring events ("every Wednesday") have no single date
+            return f"every {day_name}", None, day_name
+        days_ahead = (WEEKDAYS.index(day_name) - today.weekday()) % 7
+        resolved = today + timedelta(days=days_ahead)
+
+    filter_date = f"{resolved:%B} {resolved.day}, {resolved.year}"
+    filter_day = resolved.strftime("%A")
+    return f"{filter_day}, {filter_date}", filter_date, filter_day
+
+
+# ----------------- LOCAL SPECIFICITY CLASSIFICATION -----------------
+_EVENT_TYPES = (
+    r"yoga|music|dance|healing|sound|movie|film|talk|workshop|meditation|class(?:es)?|sessions?|concert|"
+    r"theatre|theater|art|exhibition|course|retreat|tour|market|sports?|kids|children"
+)
+# Venue names, or their distinctive part, as they appear in the event sheet's Venue column
+# (e.g. "CRIPA (Small Room)", "Harmony Hall, Bharat Nivas"); "Auroville" itself is not a venue
+KNOWN_LOCATIONS = [
+    "Pondicherry", "Matrimandir", "CRIPA", "Pitanga", "Vérité", "Language Lab", "Mohanam", "Arka", "Santé",
+    "Bamboo Centre", "Budokan", "Dehashakti", "Sadhana Forest", "Unity Pavilion", "Bharat Nivas", "Harmony Hall",
+    "CREEVA", "Solitude Farm", "Auromode", "Hall of Peace", "Pavilion of Tibetan Culture", "Tibetan Pavilion",
+    "Centre d'Art", "New Creation", "Aspiration", "Earth Institute", "Savitri Bhavan", "Sangam Hall", "Maatram",
+    "Unity Hall", "French Pavilion", "Maroma", "Sound Garden", "Bharat Kalari", "Maloka", "Anitya",
+    "Progress Hall", "Hall of Light", "Park of Unity", "Amphitheatre", "Certitude", "Multimedia Center",
+]
+_LOCATIONS_BY_NAME = {name.lower(): name for name in KNOWN_LOCATIONS}
+# The sheet writes apostrophes as ’, users usually type '
+_LOCATIONS = "|".join(
+    re.escape(name).replace("'", "['’]") for name in sorted(KNOWN_LOCATIONS, key=len, reverse=True)
+)
+_LOCATION_RE = re.compile(r"\b(" + _LOCATIONS + r")\b", re.I)
+# Event types and venues in one alternation, so classification is a single scan
+_SPECIFIC_RE = re.compile(r"\b(?:" + _EVENT_TYPES + "|" + _LOCATIONS + r")\b", re.I)
+# Every date/day form understood by resolve_dates(), stripped in one pass
+_DATE_TOKENS_RE = re.compile(
+    "|".join(pattern.pattern for pattern in (_RELATIVE_RE, _MONTH_DAY_RE, _DAY_MONTH_RE, _DAY_RE)), re.I
+)
+_WORD_RE = re.compile(r"[a-z0-9']+")
+# Words that carry no event type or location, e.g. "what's happening", "list all events for"
+_GENERIC_WORDS = frozenset(
+    "what what's whats is are was be there any anything all list show me tell give find please "
+    "happening going on in at for of the a an this next coming upcoming event events activities activity "
+    "schedule program programme and or with to can you i do see".split()
+)
+
+
+def mentions_event_details(query: str) -> bool:
+    """True if the query names an event type, a known venue or a date/day."""
+    return bool(_SPECIFIC_RE.search(query) or _DATE_TOKENS_RE.search(query))
+
+
+def classify_specificity(query: str) -> Optional[Specificity]:
+    """
+    Classify a query locally, matching the selector's Broad/Specific rules.
+
+    Returns:
+        "Specific" if it names an event type or known location, "Broad" if only date/day
+        and generic words remain, or None when the LLM should decide
+    """
+    if _SPECIFIC_RE.search(query):
+        return "Specific"
+    remaining = _DATE_TOKENS_RE.sub(" ", query)
+    if all(word in _GENERIC_WORDS for word in _WORD_RE.findall(remaining.lower())):
+        return "Broad"
+    return None
+
+
+def extract_filters(raw_query: str, today: Optional[date] = None) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Extract the day/date filters and the venue from a raw user query without the LLM.
+
+    Returns:
+        Tuple of (filter_day, filter_date, venue); None for anything not mentioned
+    """
+    _, filter_date, filter_day = resolve_dates(raw_query, today)
+    location = _LOCATION_RE.search(raw_query)
+    venue = _LOCATIONS_BY_NAME[location.group(1).lower().replace("’", "'")] if location else None
+    return filter_day, filter_date, venue
+
+
+def adds_no_filters(raw_query: str) -> bool:
+    """
+    True if finalize() keeps a Specific selection's search query unchanged and adds no filters,
+    i.e. the query mentions no date, day, date-like phrase or known venue.
+    """
+    return not any(extract_filters(raw_query)) and not _DATE_HINT_RE.search(raw_query.strip())
+
+
+def finalize(llm_out: QuerySelectorLLM, raw_query: str, today: Optional[date] = None) -> QuerySelector:
+    """
+    Build the full QuerySelector from the LLM fields and the filters extracted from the query.
+    The resolved date/day is appended to the search query. Date phrases that cannot be resolved are
+    appended as written and left to the semantic search; Broad queries without any date default to today.
+    A venue is kept in the search query rather than used as a filter: the sheet's Venue strings vary
+    ("CRIPA (Small Room)", "Harmony Hall, Bharat Nivas"), so an exact metadata match would miss them.
+    """
+    filter_day, filter_date, venue = extract_filters(raw_query, today)
+    search_query = llm_out.search_query
+    if venue and venue.lower() not in search_query.lower():
+        search_query = f"{search_query} at {venue}"
+    if not (filter_day or filter_date):
+        unresolved = [match.group(0) for match in _DATE_HINT_RE.finditer(raw_query.strip())]
+        if unresolved:
+            logger.info(f"[SELECTOR] Unresolved date phrases {unresolved} in query: {raw_query}")
+            search_query = f"{search_query} {' '.join(unresolved)}"
+        elif llm_out.specificity == "Broad":
+            filter_day, filter_date, _ = extract_filters("today", today)
+
+    if filter_date:
+        search_query = f"{search_query} on {filter_day}, {filter_date}"
+    elif filter_day:
+        search_query = f"{search_query} on every {filter_day}"
+    return QuerySelector(
+        search_query=search_query,
+        specificity=llm_out.specificity,
+        filter_day=filter_day,
+        filter_date=filter_date,
+    )
+
+
+# Static text around the date placeholder, so rendering is a single join
+INSTRUCTIONS_PARTS = INSTRUCTIONS_TEMPLATE.split("{current_date}")
+INSTRUCTIONS_TTL_SECONDS = 60
+INSTRUCTIONS_TICK_SECONDS = 30
+_cached_instructions = (float("-inf"), "")  # (monotonic timestamp, rendered instructions)
+# Kept current by _tick_instructions() once start_instructions_ticker() has run
+_ticked_instructions: Optional[str] = None
+_ticker_task: Optional[asyncio.Task] = None
+
+
+def _render_instructions() -> str:
+    return datetime.now().strftime("%A, %B %d, %Y, %I:%M %p").join(INSTRUCTIONS_PARTS)
+
+
+async def _tick_instructions():
+    global _ticked_instructions
+    while True:
+        _ticked_instructions = _render_instructions()
+        await asyncio.sleep(INSTRUCTIONS_TICK_SECONDS)
+
+
+async def start_instructions_ticker():
+    """
+    Start the background task that re-renders the selector instructions every INSTRUCTIONS_TICK_SECONDS,
+    so build_instructions() is a plain read. Runs once per process, in the event loop serving requests.
+    """
+    global _ticker_task
+    if _ticker_task is None:
+        _ticker_task = asyncio.create_task(_tick_instructions(), name="selector-instructions-ticker")
+
+
+def build_instructions(ctx=None, agent=None) -> str:
+    """
+    Dynamic instructions callable for the Agent (called by the SDK with the run context and agent).
+    Falls back to a TTL-cached render when the ticker is not running (e.g. outside the app).
+    """
+    if _ticked_instructions is not None:
+        return _ticked_instructions
+
+    global _cached_instructions
+    cached_ts, cached_str = _cached_instructions
+    now = time.monotonic()
+    if now - cached_ts >= INSTRUCTIONS_TTL_SECONDS:
+        cached_str = _render_instructions()
+        _cached_instructions = (now, cached_str)
+    return cached_str
+
+
 vectordb_query_selector_agent = Agent(
                     name="vectordb_query_selector_agent", 
-                    instructions=INSTRUCTIONS, 
+                    instructions=build_instructions, 
                     model=gemini_model,
-                    output_type=QuerySelector
-                    )
\ No newline at end of file
+                    model_settings=ModelSettings(temperature=0.1),
+                    output_type=QuerySelectorOutputSchema()
+                    )
+
+
+# Upper bound on in-flight Gemini selector calls, to stay within the per-minute quota
+SELECTOR_MAX_CONCURRENCY = 50
+_selector_semaphore = asyncio.Semaphore(SELECTOR_MAX_CONCURRENCY)
+
+# Per-attempt timeout for a selector call; slow Gemini stragglers are retried instead of awaited
+SELECTOR_TIMEOUT_S = float(os.getenv("SELECTOR_TIMEOUT_S", "8.0"))
+SELECTOR_RETRY_BACKOFF_S = (0.2, 0.5)
+
+
+# Matches the completed "search_query" string in a partially streamed JSON response
+_SEARCH_QUERY_RE = re.compile(r'"search_query"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+async def _run_selector_agent(user_query: str, on_search_query: Optional[Callable[[str], None]] = None) -> QuerySelectorLLM:
+    if on_search_query is None:
+        result = await Runner.run(vectordb_query_selector_agent, user_query)
+        return result.final_output
+
+    # Stream the structured output so the caller can start searching as soon as search_query is complete
+    result = Runner.run_streamed(vectordb_query_selector_agent, user_query)
+    streamed_parts = []
+    query_sent = False
+    try:
+        async for event in result.stream_events():
+            if query_sent:
+                continue
+            if isinstance(event, RawResponsesStreamEvent) and isinstance(event.data, ResponseTextDeltaEvent):
+                delta = event.data.delta
+                streamed_parts.append(delta)
+                # The search_query string can only close in a delta that contains a quote
+                if '"' not in delta:
+                    continue
+                match = _SEARCH_QUERY_RE.search("".join(streamed_parts))
+                if match:
+                    query_sent = True
+                    on_search_query(json.loads(match.group(1)))
+    finally:
+        if not result.is_complete:
+            result.cancel()
+    return result.final_output
+
+
+async def run_selector_with_timeout(
+    user_query: str,
+    timeout: float = SELECTOR_TIMEOUT_S,
+    max_retries: int = 2,
+    on_search_query: Optional[Callable[[str], None]] = None,
+) -> QuerySelectorLLM:
+    """
+    Run the query selector with a per-attempt timeout, retrying timed-out attempts with jittered backoff.
+    Time spent waiting for a concurrency slot does not count towards the timeout.
+    If `on_search_query` is given, the response is streamed and the callback receives the refined
+    search query as soon as it has been generated (once per attempt).
+
+    Raises:
+        asyncio.TimeoutError: If every attempt timed out
+    """
+    for attempt in range(max_retries + 1):
+        async with _selector_semaphore:
+            try:
+                return await asyncio.wait_for(_run_selector_agent(user_query, on_search_query), timeout)
+            except asyncio.TimeoutError:
+                if attempt == max_retries:
+                    logger.error(f"[SELECTOR] Timed out after {max_retries + 1} attempts for query: {user_query}")
+                    raise
+        delay = SELECTOR_RETRY_BACKOFF_S[min(attempt, len(SELECTOR_RETRY_BACKOFF_S) - 1)] * random.uniform(0.5, 1.5)
+        logger.warning(f"[SELECTOR] Attempt {attempt + 1} timed out after {timeout}s, retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+# LRU of selector results keyed on (normalized query, today's date), so "today" re-resolves after midnight
+SELECTOR_CACHE_MAX_SIZE = 2048
+_selector_cache: "OrderedDict[tuple, QuerySelector]" = OrderedDict()
+
+
+# A locally classified Broad query is only date/day tokens plus generic words (see classify_specificity()).
+# With those removed nothing is left, so it gets the query the selector itself returns for such input;
+# finalize() then appends the resolved date.
+LOCAL_BROAD_SEARCH_QUERY = "events"
+
+
+def normalize_query(user_query: str) -> str:
+    return user_query.strip().lower().rstrip("?!.,;: ")
+
+
+async def cached_select(user_query: str, on_search_query: Optional[Callable[[str], None]] = None) -> QuerySelector:
+    """
+    Return the selector output for a query, reusing the result for repeated queries on the same day.
+    `on_search_query` is passed to run_selector_with_timeout() when the LLM has to run.
+    """
+    key = (normalize_query(user_query), datetime.now().strftime("%Y-%m-%d"))
+    selection = _selector_cache.get(key)
+    if selection is not None:
+        _selector_cache.move_to_end(key)
+        logger.info(f"[SELECTOR] Cache hit for query: {user_query}")
+        return selection
+
+    if classify_specificity(user_query) == "Broad":
+        # Date/day-only queries need no rewriting, so skip the Gemini call
+        logger.info(f"[SELECTOR] Classified locally as Broad: {user_query}")
+        llm_out = QuerySelectorLLM(search_query=LOCAL_BROAD_SEARCH_QUERY, specificity="Broad")
+    else:
+        llm_out = await run_selector_with_timeout(user_query, on_search_query=on_search_query)
+    selection = finalize(llm_out, user_query)
+    _selector_cache[key] = selection
+    if len(_selector_cache) > SELECTOR_CACHE_MAX_SIZE:
+        _selector_cache.popitem(last=False)
+    return selection
+
+
+async def select_queries(user_inputs: List[str]) -> List[QuerySelector]:
+    """
+    Run the query selector on many user queries concurrently, preserving input order.
+    """
+    return await asyncio.gather(*(cached_select(q) for q in user_inputs))
+
+
+_warmed_up = False
+
+
+async def warmup():
+    """
+    Make one selector call so the TLS connection to Gemini and the structured-output path
+    are ready before the first real query. Runs once per process; disable with SELECTOR_WARMUP=0.
+    Must run inside the event loop that will serve requests, since the httpx pool is bound to it.
+    """
+    global _warmed_up
+    if _warmed_up or os.getenv("SELECTOR_WARMUP", "1") == "0":
+        return
+    _warmed_up = True
+    try:
+        await run_selector_with_timeout("yoga classes", max_retries=0)
+        logger.info("[SELECTOR] Warmup complete")
+    except Exception as e:
+        logger.warning(f"[SELECTOR] Warmup failed: {e}")